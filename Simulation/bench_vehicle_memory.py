@@ -0,0 +1,60 @@
+import argparse
+import os
+import random
+import tracemalloc
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import traffix
+
+QUEUE_SIZES = [10_000, 100_000]
+
+def clear_vehicles():
+    """Removes every queued vehicle so each run starts from an empty intersection."""
+    traffix.all_sprites.empty()
+    for approach in traffix.APPROACHES:
+        for lane in range(len(approach.lanes)):
+            traffix.vehicles[approach.name][lane].clear()
+
+def spawn_vehicles(count):
+    """Queues `count` vehicles spread across all approaches and lanes."""
+    for _ in range(count):
+        direction_number = random.randrange(traffix.NUM_SIGNALS)
+        approach = traffix.APPROACHES[direction_number]
+        lane = random.randrange(len(approach.lanes))
+        vehicle_class = random.choice(sorted(approach.lanes[lane].vehicle_classes))
+        will_turn = 1 if random.random() < approach.lanes[lane].turn_probability else 0
+        traffix.Vehicle(lane, vehicle_class, direction_number, traffix.DIRECTION_NAMES[direction_number], will_turn)
+
+def measure_bytes_per_vehicle(count, render):
+    """Returns the traced memory allocated per queued vehicle."""
+    traffix.RENDER_ENABLED = render
+    clear_vehicles()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    spawn_vehicles(count)
+    allocated = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    clear_vehicles()
+    return allocated / count
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory used per queued vehicle")
+    parser.add_argument("--render", action="store_true", help="also measure with vehicle sprites enabled")
+    args = parser.parse_args()
+
+    random.seed(0)
+    # Load every image (and rotation) once so the shared cache is not counted against vehicles
+    for approach in traffix.APPROACHES:
+        for vehicle_class in traffix.VEHICLE_TYPES.values():
+            for angle in range(0, 91, traffix.ROTATION_ANGLE):
+                traffix.get_vehicle_image(approach.image_dir, vehicle_class, angle)
+
+    modes = [False, True] if args.render else [False]
+    for render in modes:
+        for count in QUEUE_SIZES:
+            per_vehicle = measure_bytes_per_vehicle(count, render)
+            print(f"{'rendered' if render else 'headless'} {count:>7} vehicles: {per_vehicle:8.1f} bytes/vehicle")
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,14 @@
+import argparse
+import collections
+import http.server
+import json
+import logging
 import random
 import math
+import signal
 import time
 import threading
 import pygame
-import sys
 import os
 
 # --- Configuration Constants ---
@@ -12,7 +17,15 @@ DEFAULT_YELLOW_TIME = 5
 DEFAULT_GREEN_TIME = 20
 DEFAULT_MIN_GREEN_TIME = 5
 DEFAULT_MAX_GREEN_TIME = 60
-SIMULATION_DURATION = 200
+SIMULATION_DURATION = 200  # Seconds; can be overridden with --duration (e.g. 8h, 3d)
+STATS_INTERVAL = 60  # Seconds of simulation aggregated into each statistics record
+STATS_FILE = "simulation_stats.jsonl"
+STATS_HISTORY = 24  # Number of recent interval records kept in memory
+QUEUE_PERCENTILES = (50, 90, 99)
+
+LOG_RATE_LIMIT = 5  # Minimum seconds between two log lines of the same event
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = None  # Port of the HTTP metrics endpoint; disabled when None
 
 # Average times for vehicles to pass the intersection
 CAR_PASS_TIME = 2
@@ -31,6 +44,11 @@ MOVING_GAP = 15
 
 ROTATION_ANGLE = 3
 
+# Conflict detection inside the junction
+CONFLICT_DETECTION = True
+CONFLICT_CELL_SIZE = 15  # Side of a square conflict cell in pixels
+RESERVATION_SLACK = 5  # Extra ticks a cell stays reserved after the vehicle is expected to leave it
+
 # --- Pygame Colors ---
 BLACK = (0, 0, 0)
 WHITE = (255, 255, 255)
@@ -40,71 +58,342 @@ EMERGENCY_RED = (200, 0, 0) # A distinct red for emergency override
 SCREEN_WIDTH = 1400
 SCREEN_HEIGHT = 800
 
+IMAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "images")
+
+# Rendering can be switched off to run the simulation headless (no sprites are created)
+RENDER_ENABLED = True
+HEADLESS_TICK_RATE = 60  # Movement steps per second when running without a display
+
 # --- Global Variables ---
 traffic_signals = []
-NUM_SIGNALS = 4
 time_elapsed = 0
 current_green_signal_index = 0
-next_green_signal_index = (current_green_signal_index + 1) % NUM_SIGNALS
 is_yellow_light_on = 0  # 0: off, 1: on
 
 emergency_vehicles_detected = [] 
 current_priority_signal_index = -1 
-
-# Coordinates for vehicle starting positions
-START_COORDS_X = {
-    'right': [0, 0, 0],
-    'down': [755, 727, 697],
-    'left': [1400, 1400, 1400],
-    'up': [602, 627, 657]
-}
-START_COORDS_Y = {
-    'right': [348, 370, 398],
-    'down': [0, 0, 0],
-    'left': [498, 466, 436],
-    'up': [800, 800, 800]
-}
-
-# Vehicle data structure: stores lists of vehicles for each lane and a count of crossed vehicles
-vehicles = {
-    'right': {0: [], 1: [], 2: [], 'crossed': 0},
-    'down': {0: [], 1: [], 2: [], 'crossed': 0},
-    'left': {0: [], 1: [], 2: [], 'crossed': 0},
-    'up': {0: [], 1: [], 2: [], 'crossed': 0}
-}
+vehicles_crossing = False  # Whether a vehicle is driving straight through the junction (updated every tick)
+simulation_tick = 0  # Number of movement steps so far, the time axis of junction reservations
+conflict_yields = 0  # Number of vehicles that had to wait at the stop line for a conflicting reservation
+
+# Set to stop all simulation threads
+simulation_stop = threading.Event()
+
+logger = logging.getLogger("traffix")
+log_last_emitted = {}  # Event key -> [last emit time, number of suppressed repeats]
+
+def log_event(level, key, message, *args):
+    """Logs a message, dropping repeats of the same event key for LOG_RATE_LIMIT seconds."""
+    if not logger.isEnabledFor(level):
+        return
+    now = time.monotonic()
+    entry = log_last_emitted.get(key)
+    if entry is not None and now - entry[0] < LOG_RATE_LIMIT:
+        entry[1] += 1
+        return
+    if entry is not None and entry[1] > 0:
+        message += " suppressed=%d"
+        args += (entry[1],)
+    log_last_emitted[key] = [now, 0]
+    logger.log(level, message, *args)
 
 VEHICLE_TYPES = {0: 'car', 1: 'bus', 2: 'truck', 3: 'ambulance', 4: 'bike'}
-DIRECTION_NAMES = {0: 'right', 1: 'down', 2: 'left', 3: 'up'}
-
-# Coordinates of signal image, timer, and vehicle count on screen
-SIGNAL_COORDS = [(530, 230), (810, 230), (810, 570), (530, 570)]
-SIGNAL_TIMER_COORDS = [(530, 210), (810, 210), (810, 550), (530, 550)]
-VEHICLE_COUNT_COORDS = [(480, 210), (880, 210), (880, 550), (480, 550)]
-vehicle_count_display_texts = ["0", "0", "0", "0"]
-
-# Coordinates of stop lines
-STOP_LINES = {'right': 590, 'down': 330, 'left': 800, 'up': 535}
-DEFAULT_STOP_COORDS = {'right': 580, 'down': 320, 'left': 810, 'up': 545}
-
-# Dynamic stop coordinates for each lane (adjusted as vehicles accumulate)
-current_stop_coords = {
-    'right': [580, 580, 580],
-    'down': [320, 320, 320],
-    'left': [810, 810, 810],
-    'up': [545, 545, 545]
-}
-
-# Midpoint coordinates for turning vehicles
-MID_COORDS = {
-    'right': {'x': 705, 'y': 445},
-    'down': {'x': 695, 'y': 450},
-    'left': {'x': 695, 'y': 425},
-    'up': {'x': 695, 'y': 400}
-}
+
+# Intersection layout (approaches, lanes, stop lines, turn paths, exit bounds), see intersections/*.json
+DEFAULT_INTERSECTION = os.path.join(os.path.dirname(os.path.abspath(__file__)), "intersections", "four_way.json")
+HEADING_VECTORS = {'right': (1, 0), 'down': (0, 1), 'left': (-1, 0), 'up': (0, -1)}
+
+class Heading:
+    """A direction of travel. Positions are projected onto it, so movement code is direction independent.
+
+    Along a heading, larger values are further ahead. The front of a vehicle is its leading edge
+    and the rear its trailing edge.
+    """
+    __slots__ = ('name', 'dx', 'dy', 'ax', 'ay', 'forward')
+
+    def __init__(self, name):
+        self.name = name
+        self.dx, self.dy = HEADING_VECTORS[name]
+        self.ax, self.ay = abs(self.dx), abs(self.dy)
+        self.forward = self.dx + self.dy > 0  # Travelling towards increasing x or y
+
+    def project(self, coordinate):
+        """Converts a screen x (or y) coordinate on this heading's axis into a distance along it."""
+        return coordinate * (self.dx + self.dy)
+
+    def position(self, vehicle):
+        return vehicle.x * self.dx + vehicle.y * self.dy
+
+    def length(self, vehicle):
+        return vehicle.width * self.ax + vehicle.height * self.ay
+
+    def front(self, vehicle):
+        if self.forward:
+            return vehicle.x * self.dx + vehicle.y * self.dy + vehicle.width * self.ax + vehicle.height * self.ay
+        return vehicle.x * self.dx + vehicle.y * self.dy
+
+    def rear(self, vehicle):
+        if self.forward:
+            return vehicle.x * self.dx + vehicle.y * self.dy
+        return vehicle.x * self.dx + vehicle.y * self.dy - vehicle.width * self.ax - vehicle.height * self.ay
+
+    def advance(self, vehicle, distance):
+        if self.dx:
+            vehicle.x += self.dx * distance
+        if self.dy:
+            vehicle.y += self.dy * distance
+
+class Lane:
+    """A lane of an approach with its spawn point and, for turning lanes, the precomputed turn path."""
+    __slots__ = ('start', 'vehicle_classes', 'turn_probability', 'turn_start', 'turn_path', 'exit_heading')
+
+    def __init__(self, config, heading):
+        self.start = tuple(config['start'])
+        self.vehicle_classes = frozenset(config['vehicle_classes'])
+        turn = config.get('turn')
+        self.turn_probability = turn['probability'] if turn else 0
+        self.turn_start = heading.project(turn['start']) if turn else None
+        self.turn_path = build_turn_path(turn['step'], turn['rotation']) if turn else None
+        self.exit_heading = Heading(turn['exit_heading']) if turn else None
+
+class Approach:
+    """An incoming road controlled by one signal. Distances are stored along the approach heading."""
+    __slots__ = ('name', 'heading', 'image_dir', 'stop_line', 'default_stop', 'clear_line', 'spawn_weight',
+                 'lanes', 'signal_coords', 'signal_timer_coords', 'vehicle_count_coords')
+
+    def __init__(self, config):
+        self.name = config['name']
+        self.heading = Heading(config['heading'])
+        self.image_dir = config.get('image_dir', config['heading'])
+        self.stop_line = self.heading.project(config['stop_line'])
+        self.default_stop = self.heading.project(config['default_stop'])
+        self.clear_line = self.heading.project(config['clear_line'])  # Vehicles past this have left the junction
+        self.spawn_weight = config['spawn_weight']
+        self.lanes = [Lane(lane_config, self.heading) for lane_config in config['lanes']]
+        self.signal_coords = tuple(config['signal'])
+        self.signal_timer_coords = tuple(config['signal_timer'])
+        self.vehicle_count_coords = tuple(config['vehicle_count'])
+
+def build_turn_path(step, rotation):
+    """Returns the per-tick (dx, dy, rotation_angle) table of a turn of `rotation` degrees."""
+    if rotation == 0 or rotation % ROTATION_ANGLE != 0:
+        raise ValueError(f"turn rotation must be a non-zero multiple of {ROTATION_ANGLE} degrees, got {rotation}")
+    angle_step = ROTATION_ANGLE if rotation > 0 else -ROTATION_ANGLE
+    return [(step[0], step[1], angle_step * (i + 1)) for i in range(abs(rotation) // ROTATION_ANGLE)]
+
+class ConflictProbe:
+    """Stand-in vehicle used to trace the cells a path covers."""
+    __slots__ = ('x', 'y', 'width', 'height')
+
+def get_conflict_cells(vehicle):
+    """Returns the ids of the conflict cells overlapped by a vehicle's bounding box."""
+    min_x, min_y, max_x, max_y = JUNCTION_BOUNDS
+    x0, x1 = max(vehicle.x, min_x), min(vehicle.x + vehicle.width, max_x)
+    y0, y1 = max(vehicle.y, min_y), min(vehicle.y + vehicle.height, max_y)
+    if x0 >= x1 or y0 >= y1:
+        return []
+    col0, col1 = int((x0 - min_x) // CONFLICT_CELL_SIZE), math.ceil((x1 - min_x) / CONFLICT_CELL_SIZE)
+    row0, row1 = int((y0 - min_y) // CONFLICT_CELL_SIZE), math.ceil((y1 - min_y) / CONFLICT_CELL_SIZE)
+    return [row * CONFLICT_COLUMNS + col for row in range(row0, row1) for col in range(col0, col1)]
+
+def boxes_overlap(a, b):
+    """Returns whether the bounding boxes of two vehicles (or probes) overlap."""
+    return a.x < b.x + b.width and b.x < a.x + a.width and a.y < b.y + b.height and b.y < a.y + a.height
+
+def trace_conflict_path(approach, lane, will_turn, vehicle_class):
+    """Follows a vehicle through the junction at free-flow speed, starting with its front on the stop line.
+
+    Returns a list of (cell, first_tick, last_tick) with the ticks, counted from the stop line, during
+    which the vehicle overlaps each conflict cell. Movement mirrors Vehicle.move.
+    """
+    heading = approach.heading
+    probe = ConflictProbe()
+    probe.width, probe.height = get_vehicle_image(approach.image_dir, vehicle_class).get_size()
+    probe.x, probe.y = lane.start
+    heading.advance(probe, approach.stop_line - heading.front(probe))
+    speed = VEHICLE_SPEEDS[vehicle_class]
+    turn_path = lane.turn_path if will_turn else None
+
+    cell_ticks = {}
+    turn_index = 0
+    for tick in range(10000):
+        cells = get_conflict_cells(probe)
+        if not cells and cell_ticks:
+            break
+        for cell in cells:
+            if cell in cell_ticks:
+                cell_ticks[cell][1] = tick
+            else:
+                cell_ticks[cell] = [tick, tick]
+
+        if turn_path is not None and heading.front(probe) >= lane.turn_start:
+            if turn_index < len(turn_path):
+                step_x, step_y, rotation_angle = turn_path[turn_index]
+                image = get_vehicle_image(approach.image_dir, vehicle_class, rotation_angle)
+                probe.width, probe.height = image.get_size()
+                probe.x += step_x
+                probe.y += step_y
+                turn_index += 1
+            else:
+                lane.exit_heading.advance(probe, speed)
+        else:
+            heading.advance(probe, speed)
+    return [(cell, first, last) for cell, (first, last) in cell_ticks.items()]
+
+def get_conflict_path(vehicle):
+    """Returns the (cached) conflict path of a vehicle's approach, lane, turn and class."""
+    key = (vehicle.direction_number, vehicle.lane, vehicle.will_turn, vehicle.vehicle_class)
+    path = conflict_paths.get(key)
+    if path is None:
+        approach = APPROACHES[vehicle.direction_number]
+        path = trace_conflict_path(approach, approach.lanes[vehicle.lane], vehicle.will_turn, vehicle.vehicle_class)
+        conflict_paths[key] = path
+    return path
+
+class ReservationTable:
+    """Reservations of the junction's conflict cells, indexed by cell and time.
+
+    Each cell holds a short list of [start_tick, end_tick, vehicle, cell] windows, so checking or
+    claiming a path costs O(path length) instead of comparing against every vehicle in the junction.
+    Vehicles from the same approach never conflict (their lanes are parallel).
+
+    Paths are claimed at the stop line. A stall inside the junction pushes a vehicle's remaining
+    windows later, where they can overlap claims made in the meantime, so vehicles holding a
+    reservation also check each step against the cells they move into (find_blocker).
+    """
+    def __init__(self, cell_count):
+        self.cells = [[] for _ in range(cell_count)]
+
+    def is_free(self, vehicle, path, now):
+        """Returns whether no other approach holds any cell of the path while the vehicle would use it."""
+        for cell, first, last in path:
+            start, end = now + first, now + last + RESERVATION_SLACK
+            windows = self.cells[cell]
+            i = 0
+            while i < len(windows):
+                window = windows[i]
+                if window[1] < now:
+                    # Expired windows are never extended again, so they can be dropped here
+                    windows[i] = windows[-1]
+                    windows.pop()
+                    continue
+                if window[0] <= end and window[1] >= start and \
+                   window[2].direction_number != vehicle.direction_number:
+                    return False
+                i += 1
+        return True
+
+    def reserve(self, vehicle, path, now):
+        """Reserves every cell of the path for the ticks the vehicle is expected to occupy it."""
+        vehicle.reservation = []
+        for cell, first, last in path:
+            window = [now + first, now + last + RESERVATION_SLACK, vehicle, cell]
+            self.cells[cell].append(window)
+            vehicle.reservation.append(window)
+
+    def claim(self, vehicle, path, now):
+        """Reserves the path if it is free and returns whether it was."""
+        if not self.is_free(vehicle, path, now):
+            return False
+        self.reserve(vehicle, path, now)
+        return True
+
+    def refresh(self, vehicle, now, moved):
+        """Pushes back the remaining windows of a vehicle that did not move and drops finished reservations.
+
+        Windows of the cells the vehicle still covers stay open until it has actually left them.
+        """
+        occupied = get_conflict_cells(vehicle)
+        remaining = False
+        for window in vehicle.reservation:
+            if window[1] >= now:
+                if not moved:
+                    if window[0] > now:
+                        window[0] += 1
+                    window[1] += 1
+                if window[1] <= now and window[3] in occupied:
+                    window[1] = now + 1
+                remaining = True
+        if not remaining:
+            vehicle.reservation = None
+
+    def find_blocker(self, vehicle, previous, now):
+        """Returns a vehicle of another approach that the vehicle's new box runs into, if any.
+
+        Only vehicles holding a live window on one of the covered cells are candidates. Vehicles it
+        already overlapped at its `previous` box, or that are waiting on it, are skipped so two
+        vehicles never wait on each other.
+        """
+        for cell in get_conflict_cells(vehicle):
+            for window in self.cells[cell]:
+                other = window[2]
+                if window[1] >= now and other.direction_number != vehicle.direction_number and \
+                   other.blocked_by is not vehicle and boxes_overlap(vehicle, other) and \
+                   not boxes_overlap(previous, other):
+                    return other
+        return None
+
+    def release(self, vehicle, now):
+        """Removes all windows still held by a vehicle."""
+        for window in vehicle.reservation:
+            if window[1] >= now:
+                windows = self.cells[window[3]]
+                for i, other in enumerate(windows):
+                    if other is window:
+                        windows[i] = windows[-1]
+                        windows.pop()
+                        break
+        vehicle.reservation = None
+
+def load_intersection(path):
+    """Loads an intersection layout and resets the per-approach simulation state for it."""
+    global APPROACHES, DIRECTION_NAMES, NUM_SIGNALS, BACKGROUND_IMAGE, EXIT_BOUNDS, JUNCTION_BOUNDS, \
+           CONFLICT_COLUMNS, vehicles, emergency_preemptions, next_green_signal_index, reservations, conflict_paths
+    with open(path) as f:
+        config = json.load(f)
+
+    APPROACHES = [Approach(approach_config) for approach_config in config['approaches']]
+    DIRECTION_NAMES = {i: approach.name for i, approach in enumerate(APPROACHES)}
+    NUM_SIGNALS = len(APPROACHES)
+    BACKGROUND_IMAGE = config['background']
+    EXIT_BOUNDS = tuple(config['exit_bounds'])  # min_x, min_y, max_x, max_y
+    JUNCTION_BOUNDS = tuple(config['junction'])  # min_x, min_y, max_x, max_y of the conflict area
+
+    # Conflict cells covering the junction and the reservations made in them
+    min_x, min_y, max_x, max_y = JUNCTION_BOUNDS
+    CONFLICT_COLUMNS = math.ceil((max_x - min_x) / CONFLICT_CELL_SIZE)
+    reservations = ReservationTable(CONFLICT_COLUMNS * math.ceil((max_y - min_y) / CONFLICT_CELL_SIZE))
+    conflict_paths = {}  # (direction_number, lane, will_turn, vehicle_class) -> traced conflict path
+
+    # Vehicle data structure: stores lists of vehicles for each lane and a count of crossed vehicles
+    vehicles = {}
+    for approach in APPROACHES:
+        vehicles[approach.name] = {lane: [] for lane in range(len(approach.lanes))}
+        vehicles[approach.name]['crossed'] = 0
+
+    emergency_preemptions = [0] * NUM_SIGNALS  # Number of emergency overrides granted per signal
+    next_green_signal_index = (current_green_signal_index + 1) % NUM_SIGNALS
+
+load_intersection(DEFAULT_INTERSECTION)
 
 pygame.init()
 all_sprites = pygame.sprite.Group()
 
+# Vehicle images shared by all vehicles, keyed by (direction, vehicle_class, rotation_angle)
+vehicle_images = {}
+
+def get_vehicle_image(direction, vehicle_class, rotation_angle=0):
+    """Returns the (cached) image of a vehicle class facing a direction, rotated by the given angle."""
+    key = (direction, vehicle_class, rotation_angle)
+    image = vehicle_images.get(key)
+    if image is None:
+        if rotation_angle == 0:
+            image = pygame.image.load(os.path.join(IMAGES_DIR, direction, f"{vehicle_class}.png"))
+        else:
+            image = pygame.transform.rotate(get_vehicle_image(direction, vehicle_class), -rotation_angle)
+        vehicle_images[key] = image
+    return image
+
 class TrafficSignal:
     def __init__(self, red_time, yellow_time, green_time, min_green, max_green):
         self.red = red_time
@@ -115,72 +404,69 @@ class TrafficSignal:
         self.signal_text = str(DEFAULT_GREEN_TIME)
         self.total_green_time = 0
 
-class Vehicle(pygame.sprite.Sprite):
+class Vehicle:
+    """Simulation state of a single vehicle. Drawing is handled by VehicleSprite."""
+    __slots__ = ('lane', 'vehicle_class', 'speed', 'direction_number', 'direction', 'x', 'y',
+                 'width', 'height', 'stop', 'crossed_stop_line', 'will_turn', 'has_turned',
+                 'rotation_angle', 'is_emergency', 'index_in_lane', 'reservation', 'yielding', 'blocked_by',
+                 'sprite')
+
     def __init__(self, lane, vehicle_class, direction_number, direction, will_turn):
-        pygame.sprite.Sprite.__init__(self)
+        approach = APPROACHES[direction_number]
+        heading = approach.heading
         self.lane = lane
         self.vehicle_class = vehicle_class
         self.speed = VEHICLE_SPEEDS[vehicle_class]
         self.direction_number = direction_number
         self.direction = direction
-        self.x = START_COORDS_X[direction][lane]
-        self.y = START_COORDS_Y[direction][lane]
+        self.x, self.y = approach.lanes[lane].start
         self.crossed_stop_line = 0
         self.will_turn = will_turn
         self.has_turned = 0
         self.rotation_angle = 0
         self.is_emergency = (vehicle_class == 'ambulance')
+        self.reservation = None  # Reserved conflict-cell windows while passing through the junction
+        self.yielding = False  # Waiting at the stop line for a conflicting reservation to clear
+        self.blocked_by = None  # Vehicle of another approach it is waiting on inside the junction
 
-        vehicles[direction][lane].append(self)
-        self.index_in_lane = len(vehicles[direction][lane]) - 1 # Initial index
+        lane_vehicles = vehicles[direction][lane]
+        self.index_in_lane = len(lane_vehicles) # Initial index (appended to the lane below)
 
-        # Load vehicle image
-        image_path = os.path.join("images", direction, f"{vehicle_class}.png")
-        self.original_image = pygame.image.load(image_path)
-        self.current_image = pygame.image.load(image_path)
+        # Vehicle size comes from its (shared) image
+        self.width, self.height = get_vehicle_image(approach.image_dir, vehicle_class).get_size()
 
-        # Calculate initial stop coordinate for the vehicle
-        if direction == 'right':
-            if self.index_in_lane > 0 and vehicles[direction][lane][self.index_in_lane - 1].crossed_stop_line == 0:
-                self.stop = vehicles[direction][lane][self.index_in_lane - 1].stop - \
-                            vehicles[direction][lane][self.index_in_lane - 1].current_image.get_rect().width - STOPPING_GAP
-            else:
-                self.stop = DEFAULT_STOP_COORDS[direction]
-            offset = self.current_image.get_rect().width + STOPPING_GAP
-            START_COORDS_X[direction][lane] -= offset
-            current_stop_coords[direction][lane] -= offset
-        elif direction == 'left':
-            if self.index_in_lane > 0 and vehicles[direction][lane][self.index_in_lane - 1].crossed_stop_line == 0:
-                self.stop = vehicles[direction][lane][self.index_in_lane - 1].stop + \
-                            vehicles[direction][lane][self.index_in_lane - 1].current_image.get_rect().width + STOPPING_GAP
-            else:
-                self.stop = DEFAULT_STOP_COORDS[direction]
-            offset = self.current_image.get_rect().width + STOPPING_GAP
-            START_COORDS_X[direction][lane] += offset
-            current_stop_coords[direction][lane] += offset
-        elif direction == 'down':
-            if self.index_in_lane > 0 and vehicles[direction][lane][self.index_in_lane - 1].crossed_stop_line == 0:
-                self.stop = vehicles[direction][lane][self.index_in_lane - 1].stop - \
-                            vehicles[direction][lane][self.index_in_lane - 1].current_image.get_rect().height - STOPPING_GAP
-            else:
-                self.stop = DEFAULT_STOP_COORDS[direction]
-            offset = self.current_image.get_rect().height + STOPPING_GAP
-            START_COORDS_Y[direction][lane] -= offset
-            current_stop_coords[direction][lane] -= offset
-        elif direction == 'up':
-            if self.index_in_lane > 0 and vehicles[direction][lane][self.index_in_lane - 1].crossed_stop_line == 0:
-                self.stop = vehicles[direction][lane][self.index_in_lane - 1].stop + \
-                            vehicles[direction][lane][self.index_in_lane - 1].current_image.get_rect().height + STOPPING_GAP
-            else:
-                self.stop = DEFAULT_STOP_COORDS[direction]
-            offset = self.current_image.get_rect().height + STOPPING_GAP
-            START_COORDS_Y[direction][lane] += offset
-            current_stop_coords[direction][lane] += offset
-        
-        all_sprites.add(self)
+        # Calculate initial stop coordinate (distance along the approach) for the vehicle
+        leader = lane_vehicles[-1] if lane_vehicles else None
+        if leader is not None and leader.crossed_stop_line == 0:
+            self.stop = leader.stop - heading.length(leader) - STOPPING_GAP
+        else:
+            self.stop = approach.default_stop
+
+        # Spawn behind the previous vehicle if it has not yet cleared the lane start
+        if leader is not None:
+            overlap = heading.rear(leader) - STOPPING_GAP - heading.front(self)
+            if overlap < 0:
+                heading.advance(self, overlap)
+
+        self.sprite = None
+        if RENDER_ENABLED:
+            self.sprite = VehicleSprite(self)
+            all_sprites.add(self.sprite)
+
+        # Only join the lane once fully initialized, since other threads iterate the lanes
+        lane_vehicles.append(self)
+
+    def set_rotation(self, rotation_angle):
+        """Rotates the vehicle to the given angle and updates its size."""
+        self.rotation_angle = rotation_angle
+        image_dir = APPROACHES[self.direction_number].image_dir
+        self.width, self.height = get_vehicle_image(image_dir, self.vehicle_class, rotation_angle).get_size()
 
     def remove_from_lane(self):
-        all_sprites.remove(self)
+        if self.sprite is not None:
+            self.sprite.kill()
+        if self.reservation is not None:
+            reservations.release(self, simulation_tick)
         
         if self in vehicles[self.direction][self.lane]:
             vehicles[self.direction][self.lane].remove(self) 
@@ -189,38 +475,22 @@ class Vehicle(pygame.sprite.Sprite):
             veh.index_in_lane = i
 
     def move(self):
-        global emergency_vehicles_detected, current_priority_signal_index
+        global emergency_vehicles_detected, current_priority_signal_index, conflict_yields
+
+        approach = APPROACHES[self.direction_number]
+        heading = approach.heading
+        leader = vehicles[self.direction][self.lane][self.index_in_lane - 1] if self.index_in_lane > 0 else None
         
         if self.is_emergency and self.index_in_lane == 0 and self.crossed_stop_line == 0:
             if not any(v[1] == self for v in emergency_vehicles_detected):
                 emergency_vehicles_detected.append((self.direction_number, self))
-                emergency_vehicles_detected.sort(key=lambda x: x[1].x if x[1].direction == 'right' else \
-                                                              x[1].y if x[1].direction == 'down' else \
-                                                              -x[1].x if x[1].direction == 'left' else \
-                                                              -x[1].y) 
-                print(f"!!! EMERGENCY: Ambulance detected in {self.direction} lane. Adding to queue. Queue: {[DIRECTION_NAMES[sig] for sig, veh in emergency_vehicles_detected]}")
+                emergency_vehicles_detected.sort(key=lambda x: APPROACHES[x[0]].heading.position(x[1]))
+                logger.warning("emergency vehicle detected direction=%s queue=%s", self.direction,
+                               [DIRECTION_NAMES[sig] for sig, veh in emergency_vehicles_detected])
         
         # Determine if the vehicle should move based on its direction, stop line, and signal status
         can_move = False
         
-        # Check if there are any vehicles currently crossing the intersection
-        vehicles_crossing = False
-        for direction in DIRECTION_NAMES.values():
-            for lane in range(3):
-                for vehicle in vehicles[direction][lane]:
-                    if vehicle.crossed_stop_line == 1 and not vehicle.has_turned:
-                        # Check if vehicle is still within intersection bounds
-                        if (direction == 'right' and vehicle.x < 800) or \
-                           (direction == 'left' and vehicle.x > 590) or \
-                           (direction == 'down' and vehicle.y < 535) or \
-                           (direction == 'up' and vehicle.y > 330):
-                            vehicles_crossing = True
-                            break
-                if vehicles_crossing:
-                    break
-            if vehicles_crossing:
-                break
-        
         # Scenario 1: No emergency currently prioritized, normal traffic flow
         if current_priority_signal_index == -1:
             if self.direction_number == current_green_signal_index and is_yellow_light_on == 0:
@@ -229,16 +499,14 @@ class Vehicle(pygame.sprite.Sprite):
                 can_move = True
             elif self.is_emergency and self.index_in_lane == 0 and not vehicles_crossing:
                 can_move = True
-                print(f"Ambulance in {self.direction} lane proceeding (clear intersection).")
+                log_event(logging.INFO, ('ambulance_proceeding', self.direction),
+                          "ambulance proceeding direction=%s reason=clear_intersection", self.direction)
             elif self.is_emergency:
-                if self.index_in_lane == 0 or \
-                   (self.index_in_lane > 0 and \
-                    ((self.direction == 'right' and self.x > (vehicles[self.direction][self.lane][self.index_in_lane - 1].x + vehicles[self.direction][self.lane][self.index_in_lane - 1].current_image.get_rect().width + MOVING_GAP)) or \
-                     (self.direction == 'left' and self.x < (vehicles[self.direction][self.lane][self.index_in_lane - 1].x - vehicles[self.direction][self.lane][self.index_in_lane - 1].current_image.get_rect().width - MOVING_GAP)) or \
-                     (self.direction == 'down' and self.y > (vehicles[self.direction][self.lane][self.index_in_lane - 1].y + vehicles[self.direction][self.lane][self.index_in_lane - 1].current_image.get_rect().height + MOVING_GAP)) or \
-                     (self.direction == 'up' and self.y < (vehicles[self.direction][self.lane][self.index_in_lane - 1].y - vehicles[self.direction][self.lane][self.index_in_lane - 1].current_image.get_rect().height - MOVING_GAP)))):
+                if leader is None or \
+                   heading.position(self) - heading.position(leader) > heading.length(leader) + MOVING_GAP:
                    can_move = True
-                   print(f"Ambulance in {self.direction} lane breaking red (no current explicit priority).")
+                   log_event(logging.INFO, ('ambulance_breaking_red', self.direction),
+                             "ambulance breaking red direction=%s reason=no_priority", self.direction)
 
         # Scenario 2: Emergency mode is active
         else:
@@ -247,156 +515,123 @@ class Vehicle(pygame.sprite.Sprite):
             elif self.is_emergency and self.index_in_lane == 0 and not vehicles_crossing:
                 # Allow other ambulances to proceed if they're at the front and no vehicles are crossing
                 can_move = True
-                print(f"Ambulance in {self.direction} lane proceeding (clear intersection during priority).")
+                log_event(logging.INFO, ('ambulance_proceeding', self.direction),
+                          "ambulance proceeding direction=%s reason=clear_intersection_during_priority", self.direction)
             elif self.is_emergency: 
-                if self.index_in_lane == 0 or \
-                   (self.index_in_lane > 0 and \
-                    ((self.direction == 'right' and self.x > (vehicles[self.direction][self.lane][self.index_in_lane - 1].x + vehicles[self.direction][self.lane][self.index_in_lane - 1].current_image.get_rect().width + MOVING_GAP)) or \
-                     (self.direction == 'left' and self.x < (vehicles[self.direction][self.lane][self.index_in_lane - 1].x - vehicles[self.direction][self.lane][self.index_in_lane - 1].current_image.get_rect().width - MOVING_GAP)) or \
-                     (self.direction == 'down' and self.y > (vehicles[self.direction][self.lane][self.index_in_lane - 1].y + vehicles[self.direction][self.lane][self.index_in_lane - 1].current_image.get_rect().height + MOVING_GAP)) or \
-                     (self.direction == 'up' and self.y < (vehicles[self.direction][self.lane][self.index_in_lane - 1].y - vehicles[self.direction][self.lane][self.index_in_lane - 1].current_image.get_rect().height - MOVING_GAP)))):
+                if leader is None or \
+                   heading.position(self) - heading.position(leader) > heading.length(leader) + MOVING_GAP:
                    can_move = True
-                   print(f"Ambulance in {self.direction} lane breaking red (another ambulance has explicit priority).")
+                   log_event(logging.INFO, ('ambulance_breaking_red', self.direction),
+                             "ambulance breaking red direction=%s reason=other_priority", self.direction)
             else:
                 can_move = False # Other non-emergency vehicles must wait for current priority
 
-        if self.direction == 'right':
-            if self.crossed_stop_line == 0 and self.x + self.current_image.get_rect().width > STOP_LINES[self.direction]:
-                self.crossed_stop_line = 1
-                vehicles[self.direction]['crossed'] += 1
-            
-            if self.will_turn == 1:
-                if self.crossed_stop_line == 0 or self.x + self.current_image.get_rect().width < MID_COORDS[self.direction]['x']:
-                    if (can_move or (self.x + self.current_image.get_rect().width <= self.stop and self.crossed_stop_line == 0)) and \
-                       (self.index_in_lane == 0 or self.x + self.current_image.get_rect().width < (vehicles[self.direction][self.lane][self.index_in_lane - 1].x - MOVING_GAP) or vehicles[self.direction][self.lane][self.index_in_lane - 1].has_turned == 1):
-                        self.x += self.speed
-                else:
-                    if self.has_turned == 0:
-                        self.rotation_angle += ROTATION_ANGLE
-                        self.current_image = pygame.transform.rotate(self.original_image, -self.rotation_angle)
-                        self.x += 2
-                        self.y += 1.8
-                        if self.rotation_angle == 90:
-                            self.has_turned = 1
-                    else:
-                        if (self.index_in_lane == 0 or self.y + self.current_image.get_rect().height < (vehicles[self.direction][self.lane][self.index_in_lane - 1].y - MOVING_GAP) or 
-                            self.x + self.current_image.get_rect().width < (vehicles[self.direction][self.lane][self.index_in_lane - 1].x - MOVING_GAP)):
-                            self.y += self.speed
-            else: # Not turning
-                if (can_move or (self.x + self.current_image.get_rect().width <= self.stop and self.crossed_stop_line == 0)) and \
-                   (self.index_in_lane == 0 or self.x + self.current_image.get_rect().width < (vehicles[self.direction][self.lane][self.index_in_lane - 1].x - MOVING_GAP) or (vehicles[self.direction][self.lane][self.index_in_lane - 1].has_turned == 1)):
-                    self.x += self.speed
-            
-            # Check if vehicle has cleared the intersection
-            if self.x > SCREEN_WIDTH + 100: # Slightly beyond screen width
-                self.remove_from_lane()
-                return # Stop processing this vehicle further
-
-        elif self.direction == 'down':
-            if self.crossed_stop_line == 0 and self.y + self.current_image.get_rect().height > STOP_LINES[self.direction]:
-                self.crossed_stop_line = 1
-                vehicles[self.direction]['crossed'] += 1
-
-            if self.will_turn == 1:
-                if self.crossed_stop_line == 0 or self.y + self.current_image.get_rect().height < MID_COORDS[self.direction]['y']:
-                    if (can_move or (self.y + self.current_image.get_rect().height <= self.stop and self.crossed_stop_line == 0)) and \
-                       (self.index_in_lane == 0 or self.y + self.current_image.get_rect().height < (vehicles[self.direction][self.lane][self.index_in_lane - 1].y - MOVING_GAP) or vehicles[self.direction][self.lane][self.index_in_lane - 1].has_turned == 1):
-                        self.y += self.speed
-                else:
-                    if self.has_turned == 0:
-                        self.rotation_angle += ROTATION_ANGLE
-                        self.current_image = pygame.transform.rotate(self.original_image, -self.rotation_angle)
-                        self.x -= 2.5
-                        self.y += 2
-                        if self.rotation_angle == 90:
-                            self.has_turned = 1
-                    else:
-                        if (self.index_in_lane == 0 or self.x > (vehicles[self.direction][self.lane][self.index_in_lane - 1].x + vehicles[self.direction][self.lane][self.index_in_lane - 1].current_image.get_rect().width + MOVING_GAP) or 
-                            self.y < (vehicles[self.direction][self.lane][self.index_in_lane - 1].y - MOVING_GAP)):
-                            self.x -= self.speed
-            else: # Not turning
-                if (can_move or (self.y + self.current_image.get_rect().height <= self.stop and self.crossed_stop_line == 0)) and \
-                   (self.index_in_lane == 0 or self.y + self.current_image.get_rect().height < (vehicles[self.direction][self.lane][self.index_in_lane - 1].y - MOVING_GAP) or (vehicles[self.direction][self.lane][self.index_in_lane - 1].has_turned == 1)):
-                    self.y += self.speed
-
-            if self.y > SCREEN_HEIGHT + 100: 
-                self.remove_from_lane()
-                return
-
-        elif self.direction == 'left':
-            if self.crossed_stop_line == 0 and self.x < STOP_LINES[self.direction]:
-                self.crossed_stop_line = 1
-                vehicles[self.direction]['crossed'] += 1
-
-            if self.will_turn == 1:
-                if self.crossed_stop_line == 0 or self.x > MID_COORDS[self.direction]['x']:
-                    if (can_move or (self.x >= self.stop and self.crossed_stop_line == 0)) and \
-                       (self.index_in_lane == 0 or self.x > (vehicles[self.direction][self.lane][self.index_in_lane - 1].x + vehicles[self.direction][self.lane][self.index_in_lane - 1].current_image.get_rect().width + MOVING_GAP) or vehicles[self.direction][self.lane][self.index_in_lane - 1].has_turned == 1):
-                        self.x -= self.speed
-                else:
-                    if self.has_turned == 0:
-                        self.rotation_angle += ROTATION_ANGLE
-                        self.current_image = pygame.transform.rotate(self.original_image, -self.rotation_angle)
-                        self.x -= 1.8
-                        self.y -= 2.5
-                        if self.rotation_angle == 90:
-                            self.has_turned = 1
-                    else:
-                        if (self.index_in_lane == 0 or self.y > (vehicles[self.direction][self.lane][self.index_in_lane - 1].y + vehicles[self.direction][self.lane][self.index_in_lane - 1].current_image.get_rect().height + MOVING_GAP) or 
-                            self.x > (vehicles[self.direction][self.lane][self.index_in_lane - 1].x + MOVING_GAP)):
-                            self.y -= self.speed
-            else: # Not turning
-                if (can_move or (self.x >= self.stop and self.crossed_stop_line == 0)) and \
-                   (self.index_in_lane == 0 or self.x > (vehicles[self.direction][self.lane][self.index_in_lane - 1].x + vehicles[self.direction][self.lane][self.index_in_lane - 1].current_image.get_rect().width + MOVING_GAP) or (vehicles[self.direction][self.lane][self.index_in_lane - 1].has_turned == 1)):
-                    self.x -= self.speed
-
-            # Check if vehicle has cleared the intersection
-            if self.x + self.current_image.get_rect().width < -100: # Slightly beyond left edge
-                self.remove_from_lane()
-                return
-
-        elif self.direction == 'up':
-            if self.crossed_stop_line == 0 and self.y < STOP_LINES[self.direction]:
-                self.crossed_stop_line = 1
-                vehicles[self.direction]['crossed'] += 1
-            
-            if self.will_turn == 1:
-                if self.crossed_stop_line == 0 or self.y > MID_COORDS[self.direction]['y']:
-                    if (can_move or (self.y >= self.stop and self.crossed_stop_line == 0)) and \
-                       (self.index_in_lane == 0 or self.y > (vehicles[self.direction][self.lane][self.index_in_lane - 1].y + vehicles[self.direction][self.lane][self.index_in_lane - 1].current_image.get_rect().height + MOVING_GAP) or vehicles[self.direction][self.lane][self.index_in_lane - 1].has_turned == 1):
-                        self.y -= self.speed
+        front = heading.front(self)
+        if self.crossed_stop_line == 0 and front > approach.stop_line:
+            self.crossed_stop_line = 1
+            vehicles[self.direction]['crossed'] += 1
+
+        lane = approach.lanes[self.lane]
+        previous = None
+        if self.reservation is not None:
+            previous = ConflictProbe()
+            previous.x, previous.y, previous.width, previous.height = self.x, self.y, self.width, self.height
+            previous_turn = (self.rotation_angle, self.has_turned)
+
+        moved = False
+        if self.will_turn == 1 and self.crossed_stop_line == 1 and front >= lane.turn_start:
+            moved = True
+            if self.has_turned == 0:
+                step_x, step_y, rotation_angle = lane.turn_path[abs(self.rotation_angle) // ROTATION_ANGLE]
+                self.set_rotation(rotation_angle)
+                self.x += step_x
+                self.y += step_y
+                if rotation_angle == lane.turn_path[-1][2]:
+                    self.has_turned = 1
+            else:
+                exit_heading = lane.exit_heading
+                if leader is None or exit_heading.front(self) < exit_heading.rear(leader) - MOVING_GAP or \
+                   front < heading.rear(leader) - MOVING_GAP:
+                    exit_heading.advance(self, self.speed)
                 else:
-                    if self.has_turned == 0:
-                        self.rotation_angle += ROTATION_ANGLE
-                        self.current_image = pygame.transform.rotate(self.original_image, -self.rotation_angle)
-                        self.x += 1
-                        self.y -= 1
-                        if self.rotation_angle == 90:
-                            self.has_turned = 1
+                    moved = False
+        else: # Driving straight (or not yet at the turning point)
+            if (can_move or (front <= self.stop and self.crossed_stop_line == 0)) and \
+               (leader is None or front < heading.rear(leader) - MOVING_GAP or leader.has_turned == 1):
+                moved = True
+                # Entering the junction needs the cells of the whole path; yield at the stop line otherwise
+                if CONFLICT_DETECTION and self.crossed_stop_line == 0 and self.reservation is None and \
+                   front + self.speed > approach.stop_line:
+                    if reservations.claim(self, get_conflict_path(self), simulation_tick):
+                        self.yielding = False
                     else:
-                        if (self.index_in_lane == 0 or self.x < (vehicles[self.direction][self.lane][self.index_in_lane - 1].x - vehicles[self.direction][self.lane][self.index_in_lane - 1].current_image.get_rect().width - MOVING_GAP) or 
-                            self.y > (vehicles[self.direction][self.lane][self.index_in_lane - 1].y + MOVING_GAP)):
-                            self.x += self.speed
-            else: # Not turning
-                if (can_move or (self.y >= self.stop and self.crossed_stop_line == 0)) and \
-                   (self.index_in_lane == 0 or self.y > (vehicles[self.direction][self.lane][self.index_in_lane - 1].y + vehicles[self.direction][self.lane][self.index_in_lane - 1].current_image.get_rect().height + MOVING_GAP) or (vehicles[self.direction][self.lane][self.index_in_lane - 1].has_turned == 1)):
-                    self.y -= self.speed
-
-            # Check if vehicle has cleared the intersection
-            if self.y + self.current_image.get_rect().height < -100:
-                self.remove_from_lane()
-                return
+                        moved = False
+                        if not self.yielding:
+                            self.yielding = True
+                            conflict_yields += 1
+                if moved:
+                    heading.advance(self, self.speed)
+
+        # A stall can push the windows of a vehicle inside the junction onto later claims, so each step is re-checked
+        self.blocked_by = None
+        if moved and previous is not None:
+            self.blocked_by = reservations.find_blocker(self, previous, simulation_tick)
+            if self.blocked_by is not None:
+                self.x, self.y, self.width, self.height = previous.x, previous.y, previous.width, previous.height
+                self.rotation_angle, self.has_turned = previous_turn
+                moved = False
+
+        if self.reservation is not None:
+            reservations.refresh(self, simulation_tick, moved)
+
+        # Check if vehicle has left the screen
+        min_x, min_y, max_x, max_y = EXIT_BOUNDS
+        if self.crossed_stop_line == 1 and (self.x > max_x or self.y > max_y or
+                                            self.x + self.width < min_x or self.y + self.height < min_y):
+            self.remove_from_lane()
+
+class VehicleSprite(pygame.sprite.Sprite):
+    """Presentation side of a Vehicle, only created when rendering is enabled."""
+    def __init__(self, vehicle):
+        pygame.sprite.Sprite.__init__(self)
+        self.vehicle = vehicle
+
+    @property
+    def current_image(self):
+        vehicle = self.vehicle
+        image_dir = APPROACHES[vehicle.direction_number].image_dir
+        return get_vehicle_image(image_dir, vehicle.vehicle_class, vehicle.rotation_angle)
+
+def update_vehicles_crossing():
+    """Checks whether any vehicle is still driving straight through the junction."""
+    global vehicles_crossing
+    for approach in APPROACHES:
+        heading = approach.heading
+        for lane in range(len(approach.lanes)):
+            for vehicle in vehicles[approach.name][lane]:
+                if vehicle.crossed_stop_line == 1 and not vehicle.has_turned and \
+                   heading.position(vehicle) < approach.clear_line:
+                    vehicles_crossing = True
+                    return
+    vehicles_crossing = False
+
+def step_vehicles():
+    """Moves every vehicle in the simulation by one step."""
+    global simulation_tick
+    simulation_tick += 1
+    update_vehicles_crossing()
+    for approach in APPROACHES:
+        for lane in range(len(approach.lanes)):
+            for vehicle in list(vehicles[approach.name][lane]):
+                vehicle.move()
 
 def initialize_signals():
     """Initializes all traffic signals with default values."""
     ts1 = TrafficSignal(0, DEFAULT_YELLOW_TIME, DEFAULT_GREEN_TIME, DEFAULT_MIN_GREEN_TIME, DEFAULT_MAX_GREEN_TIME)
     traffic_signals.append(ts1)
-    ts2 = TrafficSignal(ts1.red + ts1.yellow + ts1.green, DEFAULT_YELLOW_TIME, DEFAULT_GREEN_TIME, DEFAULT_MIN_GREEN_TIME, DEFAULT_MAX_GREEN_TIME)
-    traffic_signals.append(ts2)
-    ts3 = TrafficSignal(DEFAULT_RED_TIME, DEFAULT_YELLOW_TIME, DEFAULT_GREEN_TIME, DEFAULT_MIN_GREEN_TIME, DEFAULT_MAX_GREEN_TIME)
-    traffic_signals.append(ts3)
-    ts4 = TrafficSignal(DEFAULT_RED_TIME, DEFAULT_YELLOW_TIME, DEFAULT_GREEN_TIME, DEFAULT_MIN_GREEN_TIME, DEFAULT_MAX_GREEN_TIME)
-    traffic_signals.append(ts4)
+    for i in range(1, NUM_SIGNALS):
+        red_time = ts1.red + ts1.yellow + ts1.green if i == 1 else DEFAULT_RED_TIME
+        traffic_signals.append(TrafficSignal(red_time, DEFAULT_YELLOW_TIME, DEFAULT_GREEN_TIME, DEFAULT_MIN_GREEN_TIME, DEFAULT_MAX_GREEN_TIME))
     run_signal_cycle()
 
 def calculate_and_set_green_time():
@@ -404,13 +639,9 @@ def calculate_and_set_green_time():
     num_cars, num_bikes, num_buses, num_trucks, num_ambulances = 0, 0, 0, 0, 0
     next_signal_direction = DIRECTION_NAMES[next_green_signal_index]
 
-    # Count bikes in lane 0
-    for vehicle in vehicles[next_signal_direction][0]:
-        if vehicle.crossed_stop_line == 0:
-            num_bikes += 1
-
-    # Count other vehicles in lanes 1 and 2
-    for lane_idx in range(1, 3):
+    # Count waiting vehicles of each class over all lanes of the approach
+    num_lanes = len(APPROACHES[next_green_signal_index].lanes)
+    for lane_idx in range(num_lanes):
         for vehicle in vehicles[next_signal_direction][lane_idx]:
             if vehicle.crossed_stop_line == 0:
                 vclass = vehicle.vehicle_class
@@ -422,11 +653,12 @@ def calculate_and_set_green_time():
                     num_trucks += 1
                 elif vclass == 'ambulance':
                     num_ambulances += 1
+                elif vclass == 'bike':
+                    num_bikes += 1
 
-    num_lanes = 2
     green_time = math.ceil(((num_cars * CAR_PASS_TIME) + (num_ambulances * AMBULANCE_PASS_TIME) +
                             (num_buses * BUS_PASS_TIME) + (num_trucks * TRUCK_PASS_TIME) +
-                            (num_bikes * BIKE_PASS_TIME)) / (num_lanes + 1))
+                            (num_bikes * BIKE_PASS_TIME)) / num_lanes)
 
     if green_time < DEFAULT_MIN_GREEN_TIME:
         green_time = DEFAULT_MIN_GREEN_TIME
@@ -434,10 +666,15 @@ def calculate_and_set_green_time():
         green_time = DEFAULT_MAX_GREEN_TIME
     
     traffic_signals[next_green_signal_index].green = green_time
-    print(f'Calculated Green Time for {next_signal_direction} signal: {green_time}')
+    logger.info("green time calculated direction=%s green=%d", next_signal_direction, green_time)
 
 def run_signal_cycle():
-    """Manages the cyclic behavior of traffic signals, including emergency prioritization."""
+    """Runs signal phases until the simulation is stopped."""
+    while not simulation_stop.is_set():
+        run_signal_phase()
+
+def run_signal_phase():
+    """Runs one signal phase (one second while an emergency is prioritized), including emergency prioritization."""
     global current_green_signal_index, is_yellow_light_on, next_green_signal_index, \
            emergency_vehicles_detected, current_priority_signal_index
 
@@ -447,8 +684,10 @@ def run_signal_cycle():
             emergency_vehicles_detected = [v for v in emergency_vehicles_detected if v[1].crossed_stop_line == 0]
             if len(emergency_vehicles_detected) > 0: 
                 current_priority_signal_index = emergency_vehicles_detected[0][0]
+                emergency_preemptions[current_priority_signal_index] += 1
 
-                print(f"!!! EMERGENCY OVERRIDE: Granting green to signal {current_priority_signal_index + 1} ({DIRECTION_NAMES[current_priority_signal_index]}).")
+                logger.warning("emergency override signal=TS%d direction=%s", current_priority_signal_index + 1,
+                               DIRECTION_NAMES[current_priority_signal_index])
                 
                 for i in range(NUM_SIGNALS):
                     if i != current_priority_signal_index:
@@ -466,7 +705,6 @@ def run_signal_cycle():
                 next_green_signal_index = (current_green_signal_index + 1) % NUM_SIGNALS
             else: # Queue is empty, no emergency to prioritize
                 current_priority_signal_index = -1 
-                run_signal_cycle()
                 return
 
         ambulance_passed = True
@@ -483,16 +721,16 @@ def run_signal_cycle():
                 ambulance_passed = False
         
         if ambulance_passed and current_priority_signal_index != -1: 
-            print(f"Prioritized ambulance in {DIRECTION_NAMES[current_priority_signal_index]} lane passed.")
+            logger.info("prioritized ambulance passed direction=%s", DIRECTION_NAMES[current_priority_signal_index])
             
             emergency_vehicles_detected = [v for v in emergency_vehicles_detected if v[1].crossed_stop_line == 0]
             
             current_priority_signal_index = -1 # Reset priority
 
             if len(emergency_vehicles_detected) > 0:
-                print("Proceeding to next emergency vehicle in queue.")
+                logger.info("proceeding to next emergency vehicle queue=%d", len(emergency_vehicles_detected))
             else:
-                print("No more emergency vehicles. Resuming normal traffic cycle.")
+                logger.info("no more emergency vehicles, resuming normal cycle")
                 
                 for i in range(NUM_SIGNALS):
                     traffic_signals[i].green = DEFAULT_GREEN_TIME
@@ -502,18 +740,17 @@ def run_signal_cycle():
                 next_green_signal_index = (current_green_signal_index + 1) % NUM_SIGNALS
                 traffic_signals[next_green_signal_index].red = traffic_signals[current_green_signal_index].yellow + traffic_signals[current_green_signal_index].green
         
-        print_signal_status()
+        log_signal_status()
         update_signal_timers()
-        time.sleep(1) 
-        run_signal_cycle() 
+        simulation_stop.wait(1)
 
     else: # No emergency vehicles detected or currently prioritized, go for Normal Signal Cycle
         while traffic_signals[current_green_signal_index].green > 0:
-            print_signal_status()
+            log_signal_status()
             update_signal_timers()
             # Check for emergency during normal green
             if len(emergency_vehicles_detected) > 0:
-                print("Emergency detected, interrupting normal cycle.")
+                logger.info("emergency detected, interrupting normal cycle")
                 # Force current green to red instantly
                 traffic_signals[current_green_signal_index].green = 0
                 is_yellow_light_on = 0
@@ -528,7 +765,8 @@ def run_signal_cycle():
                 detection_thread.daemon = True
                 detection_thread.start()
             
-            time.sleep(1)
+            if simulation_stop.wait(1):
+                return
             traffic_signals[current_green_signal_index].green -= 1
         
         # Check if there are any vehicles waiting in the next signal's direction
@@ -536,7 +774,7 @@ def run_signal_cycle():
         next_direction = DIRECTION_NAMES[next_signal]
         has_vehicles_waiting = False
         
-        for lane in range(3):
+        for lane in range(len(APPROACHES[next_signal].lanes)):
             for vehicle in vehicles[next_direction][lane]:
                 if vehicle.crossed_stop_line == 0: 
                     has_vehicles_waiting = True
@@ -545,7 +783,7 @@ def run_signal_cycle():
                 break
         
         if not has_vehicles_waiting:
-            print(f"Skipping {next_direction} signal as no vehicles are waiting.")
+            logger.info("skipping signal direction=%s reason=no_vehicles_waiting", next_direction)
             current_green_signal_index = (next_signal + 1) % NUM_SIGNALS
             next_green_signal_index = (current_green_signal_index + 1) % NUM_SIGNALS
             traffic_signals[current_green_signal_index].green = DEFAULT_GREEN_TIME
@@ -558,9 +796,10 @@ def run_signal_cycle():
             traffic_signals[current_green_signal_index].green = 0
             
             while traffic_signals[current_green_signal_index].yellow > 0:
-                print_signal_status()
+                log_signal_status()
                 update_signal_timers()
-                time.sleep(1)
+                if simulation_stop.wait(1):
+                    return
                 traffic_signals[current_green_signal_index].yellow -= 1
             
             is_yellow_light_on = 0
@@ -568,26 +807,24 @@ def run_signal_cycle():
             current_green_signal_index = next_green_signal_index
             next_green_signal_index = (current_green_signal_index + 1) % NUM_SIGNALS
             traffic_signals[current_green_signal_index].green = DEFAULT_GREEN_TIME
-        
-        run_signal_cycle()
 
-def print_signal_status():                                                                                                                  
-    print(f"--- Simulation Time: {time_elapsed}s --- Emergency Priority: {'ON' if current_priority_signal_index != -1 else 'OFF'} ---")
+def get_signal_state(i):
+    """Returns the state shown by signal i: 'green', 'yellow', 'emergency' or 'red'."""
     if current_priority_signal_index != -1:
-        print(f"  Current Priority Signal: {DIRECTION_NAMES[current_priority_signal_index]}")
-        print(f"  Emergency Queue: {[DIRECTION_NAMES[sig] for sig, veh in emergency_vehicles_detected if veh.crossed_stop_line == 0]}") # Only show uncrossed in queue
-    print()
-    for i in range(NUM_SIGNALS):
-        if i == current_green_signal_index and current_priority_signal_index == -1: # Normal Green
-            if is_yellow_light_on == 0:
-                print(f" GREEN TS{i+1} ({DIRECTION_NAMES[i]}) -> r:{traffic_signals[i].red} y:{traffic_signals[i].yellow} g:{traffic_signals[i].green}")
-            else:
-                print(f"YELLOW TS{i+1} ({DIRECTION_NAMES[i]}) -> r:{traffic_signals[i].red} y:{traffic_signals[i].yellow} g:{traffic_signals[i].green}")
-        elif i == current_priority_signal_index and current_priority_signal_index != -1: # Emergency Green
-             print(f"EMERGENCY TS{i+1} ({DIRECTION_NAMES[i]}) -> r:{traffic_signals[i].red} y:{traffic_signals[i].yellow} g:{traffic_signals[i].green}")
-        else: # Red
-            print(f"    RED TS{i+1} ({DIRECTION_NAMES[i]}) -> r:{traffic_signals[i].red} y:{traffic_signals[i].yellow} g:{traffic_signals[i].green}")
-    print()
+        return 'emergency' if i == current_priority_signal_index else 'red'
+    if i == current_green_signal_index:
+        return 'yellow' if is_yellow_light_on else 'green'
+    return 'red'
+
+def log_signal_status():
+    """Logs the state and timers of all signals (debug level, one line)."""
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    signals = " ".join(f"TS{i+1}={get_signal_state(i)}(r:{ts.red},y:{ts.yellow},g:{ts.green})"
+                       for i, ts in enumerate(traffic_signals))
+    emergency_queue = [DIRECTION_NAMES[sig] for sig, veh in emergency_vehicles_detected if veh.crossed_stop_line == 0]
+    logger.debug("signal status t=%d priority=%s emergency_queue=%s %s", time_elapsed,
+                 DIRECTION_NAMES.get(current_priority_signal_index, 'off'), emergency_queue, signals)
 
 
 def update_signal_timers():
@@ -613,78 +850,290 @@ def update_signal_timers():
 
 def generate_vehicles():
     """Generates vehicles randomly and adds them to the simulation."""
-    while True:
+    while not simulation_stop.is_set():
         vehicle_type_num = random.randint(1, 50)
         if vehicle_type_num == 3: 
             vehicle_class = 'ambulance'
-            lane_number = random.randint(1, 2)
         elif vehicle_type_num == 4:  
             vehicle_class = 'bike'
-            lane_number = 0
         else:
             vehicle_class = random.choice(['car', 'bus', 'truck'])
-            lane_number = random.randint(1, 2)
-        
-        will_turn = 0
-        if lane_number == 2:
-            if random.randint(0, 4) <= 2:
-                will_turn = 1
-            else:
-                will_turn = 0
-        
-        temp_direction = random.randint(0, 999)
-        direction_number = 0
-        direction_thresholds = [400, 800, 900, 1000]
-        if temp_direction < direction_thresholds[0]:
-            direction_number = 0  # Right
-        elif temp_direction < direction_thresholds[1]:
-            direction_number = 1  # Down
-        elif temp_direction < direction_thresholds[2]:
-            direction_number = 2  # Left
-        elif temp_direction < direction_thresholds[3]:
-            direction_number = 3  # Up
-        
-        Vehicle(lane_number, vehicle_class, direction_number, DIRECTION_NAMES[direction_number], will_turn)
-        time.sleep(3)
 
-def manage_simulation_time():
-    """Manages the overall simulation time and outputs statistics at the end."""
+        direction_number = random.choices(range(NUM_SIGNALS), weights=[a.spawn_weight for a in APPROACHES])[0]
+        approach = APPROACHES[direction_number]
+
+        # Pick one of the lanes of the approach that allow this vehicle class
+        lane_numbers = [i for i, lane in enumerate(approach.lanes) if vehicle_class in lane.vehicle_classes]
+        if lane_numbers:
+            lane_number = random.choice(lane_numbers)
+            will_turn = 1 if random.random() < approach.lanes[lane_number].turn_probability else 0
+            Vehicle(lane_number, vehicle_class, direction_number, DIRECTION_NAMES[direction_number], will_turn)
+        simulation_stop.wait(3)
+
+def histogram_percentile(histogram, percentile):
+    """Returns the given percentile of the values counted in a {value: count} histogram."""
+    total = sum(histogram.values())
+    if total == 0:
+        return 0
+    rank = math.ceil(total * percentile / 100)
+    seen = 0
+    for value in sorted(histogram):
+        seen += histogram[value]
+        if seen >= rank:
+            return value
+    return max(histogram)
+
+class SimulationStats:
+    """Rolling per-interval aggregates whose memory does not grow with the run length.
+
+    Queue lengths are sampled once per second into {queue_length: count} histograms, so
+    percentiles can be computed without keeping the individual samples.
+    """
+    def __init__(self, interval, stats_file, history=STATS_HISTORY):
+        self.interval = interval
+        self.stats_file = stats_file
+        self.run_started = time.strftime('%Y-%m-%dT%H:%M:%S%z')  # Identifies this run's records in a shared file
+        self.recent_intervals = collections.deque(maxlen=history)
+        self.total_queue_histograms = [collections.Counter() for _ in range(NUM_SIGNALS)]
+        self.total_preemptions = [0] * NUM_SIGNALS
+        self._start_new_interval(0)
+
+    def _start_new_interval(self, now):
+        self.interval_start = now
+        self.queue_histograms = [collections.Counter() for _ in range(NUM_SIGNALS)]
+        self.crossed_at_start = [vehicles[DIRECTION_NAMES[i]]['crossed'] for i in range(NUM_SIGNALS)]
+        self.preemptions_at_start = list(emergency_preemptions)
+
+    def sample(self, now):
+        """Records the current queue length of every approach and flushes a finished interval."""
+        for i in range(NUM_SIGNALS):
+            direction = DIRECTION_NAMES[i]
+            queue_length = 0
+            for lane in range(len(APPROACHES[i].lanes)):
+                for vehicle in vehicles[direction][lane]:
+                    if vehicle.crossed_stop_line == 0:
+                        queue_length += 1
+            self.queue_histograms[i][queue_length] += 1
+            self.total_queue_histograms[i][queue_length] += 1
+        if now - self.interval_start >= self.interval:
+            self.flush(now)
+
+    def flush(self, now):
+        """Aggregates the current interval, appends it to the stats file and starts a new interval."""
+        if now <= self.interval_start:
+            return
+        record = {
+            'run_started': self.run_started,
+            'start': self.interval_start,
+            'end': now,
+            'throughput': {},
+            'queue': {},
+            'emergency_preemptions': {},
+        }
+        for i in range(NUM_SIGNALS):
+            direction = DIRECTION_NAMES[i]
+            preemptions = emergency_preemptions[i] - self.preemptions_at_start[i]
+            self.total_preemptions[i] += preemptions
+            record['throughput'][direction] = vehicles[direction]['crossed'] - self.crossed_at_start[i]
+            record['queue'][direction] = self._queue_percentiles(self.queue_histograms[i])
+            record['emergency_preemptions'][direction] = preemptions
+        self.recent_intervals.append(record)
+        self._write_record(record)
+        self._start_new_interval(now)
+
+    def _queue_percentiles(self, histogram):
+        percentiles = {f'p{p}': histogram_percentile(histogram, p) for p in QUEUE_PERCENTILES}
+        percentiles['max'] = max(histogram, default=0)
+        return percentiles
+
+    def _write_record(self, record):
+        if not self.stats_file:
+            return
+        # A full disk or a vanished mount must not stop the clock thread; the interval stays in memory
+        try:
+            with open(self.stats_file, 'a') as f:
+                f.write(json.dumps(record) + '\n')
+        except OSError as error:
+            log_event(logging.ERROR, ('stats_write_failed',), "stats record not written path=%s error=%s",
+                      self.stats_file, error)
+
+    def check_stats_file(self):
+        """Disables the stats file if it cannot be opened for appending, instead of failing mid-run."""
+        if not self.stats_file:
+            return
+        try:
+            with open(self.stats_file, 'a'):
+                pass
+        except OSError as error:
+            logger.error("stats file disabled path=%s error=%s", self.stats_file, error)
+            self.stats_file = None
+
+    def print_summary(self, elapsed):
+        """Flushes the last (partial) interval and prints the statistics of the whole run."""
+        self.flush(elapsed)
+        total_vehicles_passed = 0
+        print('\n--- Simulation Summary ---')
+        print(f'Run started: {self.run_started}')
+        print('Lane-wise Vehicle Counts:')
+        for i in range(NUM_SIGNALS):
+            crossed_count = vehicles[DIRECTION_NAMES[i]]['crossed']
+            print(f'  Lane {i+1} ({DIRECTION_NAMES[i]}): {crossed_count} vehicles')
+            total_vehicles_passed += crossed_count
+        print(f'Total vehicles passed: {total_vehicles_passed}')
+        print(f'Total time passed: {elapsed} seconds')
+        if elapsed > 0:
+            print(f'Vehicles passed per unit time: {total_vehicles_passed / float(elapsed):.2f}')
+        print('Queue lengths (p50/p90/p99/max):')
+        for i in range(NUM_SIGNALS):
+            queue = self._queue_percentiles(self.total_queue_histograms[i])
+            print(f"  Lane {i+1} ({DIRECTION_NAMES[i]}): {queue['p50']}/{queue['p90']}/{queue['p99']}/{queue['max']}")
+        print(f'Emergency preemptions: {sum(self.total_preemptions)} '
+              f'({", ".join(f"{DIRECTION_NAMES[i]}: {n}" for i, n in enumerate(self.total_preemptions))})')
+        print(f'Vehicles that yielded at the stop line: {conflict_yields}')
+        if self.recent_intervals:
+            busiest = max(self.recent_intervals, key=lambda r: sum(r['throughput'].values()))
+            print(f"Busiest recent interval: {busiest['start']}-{busiest['end']}s "
+                  f"with {sum(busiest['throughput'].values())} vehicles")
+
+def manage_simulation_time(stats):
+    """Advances the simulation clock, samples statistics and stops the simulation after its duration."""
     global time_elapsed
-    while True:
+    while not simulation_stop.wait(1):
         time_elapsed += 1
-        time.sleep(1)
-        if time_elapsed == SIMULATION_DURATION:
-            total_vehicles_passed = 0
-            print('\n--- Simulation Summary ---')
-            print('Lane-wise Vehicle Counts:')
-            for i in range(NUM_SIGNALS):
-                crossed_count = vehicles[DIRECTION_NAMES[i]]['crossed']
-                print(f'  Lane {i+1} ({DIRECTION_NAMES[i]}): {crossed_count} vehicles')
-                total_vehicles_passed += crossed_count
-            print(f'Total vehicles passed: {total_vehicles_passed}')
-            print(f'Total time passed: {time_elapsed} seconds')
-            if time_elapsed > 0:
-                print(f'Vehicles passed per unit time: {total_vehicles_passed / float(time_elapsed):.2f}')
-            os._exit(0)
+        stats.sample(time_elapsed)
+        if time_elapsed >= SIMULATION_DURATION:
+            simulation_stop.set()
+
+def parse_duration(text):
+    """Parses a duration such as '200', '90s', '30m', '8h' or '3d' into seconds."""
+    units = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+    text = text.strip().lower()
+    try:
+        if text and text[-1] in units:
+            seconds = float(text[:-1]) * units[text[-1]]
+        else:
+            seconds = float(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid duration: {text!r}")
+    if seconds <= 0:
+        raise argparse.ArgumentTypeError(f"duration must be positive: {text!r}")
+    # The clock ticks in whole seconds, so round fractions up rather than down to zero
+    return math.ceil(seconds)
+
+def get_metrics_snapshot():
+    """Returns the current signal, lane and emergency state of the simulation."""
+    snapshot = {
+        'time_elapsed': time_elapsed,
+        'current_green': DIRECTION_NAMES[current_green_signal_index],
+        'next_green': DIRECTION_NAMES[next_green_signal_index],
+        'yellow': bool(is_yellow_light_on),
+        'priority': DIRECTION_NAMES.get(current_priority_signal_index),
+        'signals': {},
+        'lanes': {},
+        'emergency_queue': [DIRECTION_NAMES[sig] for sig, veh in list(emergency_vehicles_detected)
+                            if veh.crossed_stop_line == 0],
+        'emergency_preemptions': {DIRECTION_NAMES[i]: emergency_preemptions[i] for i in range(NUM_SIGNALS)},
+        'conflict_yields': conflict_yields,
+    }
+    for i, ts in enumerate(list(traffic_signals)):
+        snapshot['signals'][DIRECTION_NAMES[i]] = {'state': get_signal_state(i), 'red': ts.red,
+                                                   'yellow': ts.yellow, 'green': ts.green}
+    for approach in APPROACHES:
+        direction = approach.name
+        queue = [sum(1 for vehicle in list(vehicles[direction][lane]) if vehicle.crossed_stop_line == 0)
+                 for lane in range(len(approach.lanes))]
+        snapshot['lanes'][direction] = {'queue': queue, 'crossed': vehicles[direction]['crossed']}
+    return snapshot
+
+def format_metrics_text(snapshot):
+    """Formats a metrics snapshot as Prometheus-style text lines."""
+    lines = [f"traffix_time_elapsed_seconds {snapshot['time_elapsed']}",
+             f"traffix_emergency_queue_length {len(snapshot['emergency_queue'])}",
+             f"traffix_conflict_yields_total {snapshot['conflict_yields']}"]
+    for direction, signal in snapshot['signals'].items():
+        lines.append(f'traffix_signal_state{{direction="{direction}",state="{signal["state"]}"}} 1')
+        for timer in ('red', 'yellow', 'green'):
+            lines.append(f'traffix_signal_timer_seconds{{direction="{direction}",timer="{timer}"}} {signal[timer]}')
+    for direction, lane_info in snapshot['lanes'].items():
+        for lane, queue_length in enumerate(lane_info['queue']):
+            lines.append(f'traffix_lane_queue_length{{direction="{direction}",lane="{lane}"}} {queue_length}')
+        lines.append(f'traffix_crossed_total{{direction="{direction}"}} {lane_info["crossed"]}')
+        lines.append(f'traffix_emergency_preemptions_total{{direction="{direction}"}} '
+                     f'{snapshot["emergency_preemptions"][direction]}')
+    return "\n".join(lines) + "\n"
+
+class MetricsRequestHandler(http.server.BaseHTTPRequestHandler):
+    """Serves the metrics snapshot as JSON on /metrics and as text on /metrics.txt."""
+    def do_GET(self):
+        path = self.path.split('?', 1)[0]
+        if path in ('/', '/metrics'):
+            body = json.dumps(get_metrics_snapshot()).encode()
+            content_type = 'application/json'
+        elif path == '/metrics.txt':
+            body = format_metrics_text(get_metrics_snapshot()).encode()
+            content_type = 'text/plain; version=0.0.4'
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug("metrics request %s", format % args)
+
+def start_metrics_server(host, port):
+    """Starts the metrics HTTP server on its own thread and returns it."""
+    server = http.server.ThreadingHTTPServer((host, port), MetricsRequestHandler)
+    server.daemon_threads = True
+    metrics_thread = threading.Thread(name="metricsServer", target=server.serve_forever)
+    metrics_thread.daemon = True
+    metrics_thread.start()
+    logger.info("metrics endpoint listening url=http://%s:%d/metrics", host, server.server_address[1])
+    return server
 
 class TrafficSimulationApp:
     """Main application class for the traffic simulation."""
     def __init__(self):
+        self.stats = SimulationStats(STATS_INTERVAL, STATS_FILE)
+        self.stats.check_stats_file()
+
+        # Ctrl-C and SIGTERM stop the simulation like closing the window, so the summary still gets written
+        signal.signal(signal.SIGINT, self._handle_stop_signal)
+        signal.signal(signal.SIGTERM, self._handle_stop_signal)
+
+        if not RENDER_ENABLED:
+            self._start_threads()
+            self._run_headless_loop()
+            self._shutdown()
+            return
+
         pygame.display.set_caption("Traffic Simulation")
         self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-        self.background = pygame.image.load('images/mod_int.png')
+        self.background = pygame.image.load(os.path.join(IMAGES_DIR, BACKGROUND_IMAGE))
         
-        self.red_signal_img = pygame.image.load('images/signals/red.png')
-        self.yellow_signal_img = pygame.image.load('images/signals/yellow.png')
-        self.green_signal_img = pygame.image.load('images/signals/green.png')
+        self.red_signal_img = pygame.image.load(os.path.join(IMAGES_DIR, 'signals', 'red.png'))
+        self.yellow_signal_img = pygame.image.load(os.path.join(IMAGES_DIR, 'signals', 'yellow.png'))
+        self.green_signal_img = pygame.image.load(os.path.join(IMAGES_DIR, 'signals', 'green.png'))
         self.font = pygame.font.Font(None, 30)
 
         self._start_threads()
         self._run_game_loop()
+        self._shutdown()
 
     def _start_threads(self):
         """Starts the necessary simulation threads."""
-        simulation_time_thread = threading.Thread(name="simulationTime", target=manage_simulation_time)
+        # Bind the metrics port first; a port already in use only disables metrics instead of aborting the run
+        self.metrics_server = None
+        if METRICS_PORT is not None:
+            try:
+                self.metrics_server = start_metrics_server(METRICS_HOST, METRICS_PORT)
+            except OSError as error:
+                logger.error("metrics endpoint disabled host=%s port=%d error=%s", METRICS_HOST, METRICS_PORT, error)
+
+        simulation_time_thread = threading.Thread(name="simulationTime", target=manage_simulation_time, args=(self.stats,))
         simulation_time_thread.daemon = True
         simulation_time_thread.start()
 
@@ -696,13 +1145,29 @@ class TrafficSimulationApp:
         vehicle_generation_thread.daemon = True
         vehicle_generation_thread.start()
 
+        self.threads = [simulation_time_thread, initialization_thread, vehicle_generation_thread]
+
+    def _handle_stop_signal(self, signum, frame):
+        logger.info("stop requested signal=%s", signal.Signals(signum).name)
+        simulation_stop.set()
+
+    def _shutdown(self):
+        """Stops the simulation threads and reports the final statistics."""
+        simulation_stop.set()
+        if self.metrics_server is not None:
+            self.metrics_server.shutdown()
+            self.metrics_server.server_close()
+        for thread in self.threads:
+            thread.join(timeout=5)
+        self.stats.print_summary(time_elapsed)
+        pygame.quit()
+
     def _run_game_loop(self):
         """Main Pygame event loop and rendering."""
-        while True:
+        while not simulation_stop.is_set():
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
+                    return
 
             self.screen.blit(self.background, (0, 0))
 
@@ -712,6 +1177,12 @@ class TrafficSimulationApp:
 
             pygame.display.update()
 
+    def _run_headless_loop(self):
+        """Moves vehicles at a fixed tick rate without opening a window."""
+        while not simulation_stop.is_set():
+            step_vehicles()
+            time.sleep(1 / HEADLESS_TICK_RATE)
+
     def _draw_signals_and_timers(self):
         """Draws traffic signals, their timers, and vehicle counts on the screen."""
         for i in range(NUM_SIGNALS):
@@ -741,23 +1212,22 @@ class TrafficSimulationApp:
                 elif traffic_signals[i].red == 0:
                     traffic_signals[i].signal_text = "GO"
             
-            self.screen.blit(signal_img_to_draw, SIGNAL_COORDS[i])
+            self.screen.blit(signal_img_to_draw, APPROACHES[i].signal_coords)
 
             # Render signal timer
             signal_timer_surface = self.font.render(str(traffic_signals[i].signal_text), True, WHITE, BLACK)
-            self.screen.blit(signal_timer_surface, SIGNAL_TIMER_COORDS[i])
+            self.screen.blit(signal_timer_surface, APPROACHES[i].signal_timer_coords)
 
             # Render vehicle count
             display_count = vehicles[DIRECTION_NAMES[i]]['crossed']
             vehicle_count_surface = self.font.render(str(display_count), True, BLACK, WHITE)
-            self.screen.blit(vehicle_count_surface, VEHICLE_COUNT_COORDS[i])
+            self.screen.blit(vehicle_count_surface, APPROACHES[i].vehicle_count_coords)
 
     def _draw_vehicles(self):
         """Draws all vehicles currently in the simulation and updates their positions."""
-        for vehicle in list(all_sprites): 
-            if vehicle.alive(): 
-                self.screen.blit(vehicle.current_image, (vehicle.x, vehicle.y))
-                vehicle.move()
+        for sprite in all_sprites:
+            self.screen.blit(sprite.current_image, (sprite.vehicle.x, sprite.vehicle.y))
+        step_vehicles()
 
     def _display_elapsed_time(self):
         """Displays the elapsed simulation time on the screen."""
@@ -765,5 +1235,33 @@ class TrafficSimulationApp:
         self.screen.blit(time_elapsed_surface, (1100, 50))
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Adaptive traffic signal simulation")
+    parser.add_argument("--headless", action="store_true", help="run without a window or vehicle sprites")
+    parser.add_argument("--intersection", default=DEFAULT_INTERSECTION,
+                        help="intersection layout file (default: intersections/four_way.json)")
+    parser.add_argument("--no-conflict-detection", action="store_true",
+                        help="let vehicles enter the junction without reserving their path")
+    parser.add_argument("--duration", type=parse_duration, default=SIMULATION_DURATION,
+                        help="simulation length, e.g. 200, 45m, 8h or 3d (default: %(default)s seconds)")
+    parser.add_argument("--stats-interval", type=parse_duration, default=STATS_INTERVAL,
+                        help="length of each aggregated statistics interval (default: %(default)s seconds)")
+    parser.add_argument("--stats-file", default=STATS_FILE,
+                        help="JSON-lines file the interval statistics are appended to (default: %(default)s)")
+    parser.add_argument("--metrics-port", type=int, default=METRICS_PORT,
+                        help="serve live metrics over HTTP on this port (/metrics JSON, /metrics.txt text)")
+    parser.add_argument("--metrics-host", default=METRICS_HOST,
+                        help="address the metrics endpoint binds to (default: %(default)s)")
+    parser.add_argument("--log-level", default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+                        help="DEBUG also logs the signal status every second (default: %(default)s)")
+    args = parser.parse_args()
+    logging.basicConfig(level=args.log_level, format="%(asctime)s %(levelname)s %(threadName)s %(message)s")
+    load_intersection(args.intersection)
+    CONFLICT_DETECTION = not args.no_conflict_detection
+    METRICS_PORT = args.metrics_port
+    METRICS_HOST = args.metrics_host
+    RENDER_ENABLED = not args.headless
+    SIMULATION_DURATION = args.duration
+    STATS_INTERVAL = args.stats_interval
+    STATS_FILE = args.stats_file
     TrafficSimulationApp()
 